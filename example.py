@@ -5,5 +5,5 @@ from utils import preprocess_spectral_folder
 
 path = "/Users/ariessunfeld/Documents/personal/UH/jade-comellas/VISIR/to_send"
 
-preprocess_spectral_folder(path)
-
+if __name__ == "__main__":
+    preprocess_spectral_folder(path)
@@ -1,9 +1,66 @@
+import csv
+import multiprocessing
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
 from pathlib import Path
-from typing import Union
+from typing import Optional, Union
 import numpy as np
 import pandas as pd
 from astropy.io import fits
 
+try:
+    import pyarrow as pa
+    import pyarrow.csv as pacsv
+    # Unquoted header, to match the pandas writer (needs a pyarrow with quoting_header)
+    _CSV_WRITE_OPTIONS = pacsv.WriteOptions(quoting_header='none')
+except (ImportError, TypeError):  # pyarrow is optional; fall back to the pandas CSV writer
+    pa = None
+
+try:
+    import polars as pl
+except ImportError:  # polars is optional; ASD files are then parsed with pandas only
+    pl = None
+
+try:
+    from numba import njit
+except ImportError:  # numba is optional; the offset kernel then runs as plain NumPy
+    njit = None
+
+def _to_dataframe(x: np.ndarray, y: np.ndarray) -> pd.DataFrame:
+    """
+    Wraps spectrum arrays in a DataFrame with 'x' and 'y' columns, without copying them.
+
+    Parameters:
+        x (np.ndarray): Wavelengths.
+        y (np.ndarray): Values at each wavelength.
+
+    Returns:
+        pd.DataFrame: DataFrame with columns ['x', 'y'].
+    """
+    return pd.DataFrame({'x': x, 'y': y}, copy=False)
+
+def _extract_arrays_from_fits(file_path: Union[str, Path]) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Extracts wavelength and reflectance arrays from a SCAM .fits file.
+
+    Parameters:
+        file_path (str or Path): Path to the FITS file.
+
+    Returns:
+        tuple[np.ndarray, np.ndarray]: Wavelength (µm) and reflectance arrays.
+    """
+    file_path = Path(file_path)
+    
+    # Memory-map the file and copy out only the two needed columns, as native
+    # contiguous float32, before the HDUs close
+    with fits.open(file_path, memmap=True, lazy_load_hdus=True) as hdul:
+        reflectance = np.ascontiguousarray(hdul['Spectra'].data['I_F_Atm'], dtype=np.float32)
+        wavelength = np.ascontiguousarray(hdul['Wavelength'].data['Wavelength (um)'], dtype=np.float32)
+    
+    return wavelength, reflectance
+
 def extract_spectrum_from_fits(file_path: Union[str, Path]) -> pd.DataFrame:
     """
     Extracts wavelength and reflectance data from a SCAM .fits file.
@@ -14,73 +71,235 @@ def extract_spectrum_from_fits(file_path: Union[str, Path]) -> pd.DataFrame:
     Returns:
         pd.DataFrame: DataFrame with 'x' (wavelength in µm) and 'y' (reflectance) columns.
     """
+    return _to_dataframe(*_extract_arrays_from_fits(file_path))
+
+def _join_index(x: np.ndarray, wavelength: float) -> int:
+    """
+    Locates a join wavelength in a sorted wavelength array.
+
+    Parameters:
+        x (np.ndarray): Monotonically increasing wavelengths.
+        wavelength (float): Join wavelength to look up; must be present in x.
+
+    Returns:
+        int: Index of the join wavelength in x.
+
+    Raises:
+        ValueError: If the join wavelength is not present in x.
+    """
+    i = np.searchsorted(x, wavelength)
+    if i == len(x) or x[i] != wavelength:
+        raise ValueError("Join wavelength not found in spectrum")
+    return i
+
+def _join_indices(
+    x: np.ndarray,
+    j1a: float,
+    j1b: float,
+    j2a: float,
+    j2b: float
+) -> tuple[int, int, int, int]:
+    """
+    Locates both pairs of join wavelengths in a sorted wavelength array.
+
+    Parameters:
+        x (np.ndarray): Monotonically increasing wavelengths.
+        j1a, j1b (float): First join wavelengths (e.g., between VNIR and SWIR1).
+        j2a, j2b (float): Second join wavelengths (e.g., between SWIR1 and SWIR2).
+
+    Returns:
+        tuple[int, int, int, int]: Indices of j1a, j1b, j2a and j2b in x.
+    """
+    return _join_index(x, j1a), _join_index(x, j1b), _join_index(x, j2a), _join_index(x, j2b)
+
+def _apply_offsets(y: np.ndarray, i1a: int, i1b: int, i2a: int, i2b: int) -> None:
+    """
+    Removes the step offsets at two spectrometer joins from a spectrum, in place.
+
+    Parameters:
+        y (np.ndarray): Values at each wavelength; overwritten with the corrected values.
+        i1a, i1b (int): Indices of the first join wavelengths (see _join_indices).
+        i2a, i2b (int): Indices of the second join wavelengths.
+    """
+    d1 = y[i1b] - y[i1a]
+    d2 = y[i2b] - (y[i2a] - d1)
+
+    y[i1b:i2a + 1] -= d1
+    y[i2a + 1:] -= d2
+
+if njit is not None:
+    _join_index = njit(cache=True)(_join_index)
+    _join_indices = njit(cache=True)(_join_indices)
+    _apply_offsets = njit(cache=True)(_apply_offsets)
+
+def _join_wavelengths(offset_params: dict, dtype: np.dtype) -> np.ndarray:
+    """
+    Collects the join1/join2 wavelengths from offset kwargs, falling back to the ASD defaults.
+
+    Parameters:
+        offset_params (dict): Join-related kwargs (e.g., join1, join2).
+        dtype (np.dtype): Dtype of the wavelength array, so joins compare at the data's precision.
+
+    Returns:
+        np.ndarray: The four join wavelengths, in order.
+    """
+    join1 = offset_params.get("join1", (1000, 1001))
+    join2 = offset_params.get("join2", (1800, 1801))
+    return np.array([*join1, *join2], dtype=dtype)
+
+_NUMBER = rb'[-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?'
+_DATA_ROW = re.compile(rb'\s*' + _NUMBER + rb'\s+' + _NUMBER + rb'\s*')
+
+def _find_data_start(file_path: Path) -> int:
+    """
+    Counts the preamble lines before the first two-column numeric row of an ASD .txt file.
+
+    Parameters:
+        file_path (Path): Path to the .asd.txt file.
+
+    Returns:
+        int: Number of lines preceding the spectral data.
+    """
+    # Scan raw bytes (no per-line decoding) against a precompiled pattern
+    # instead of trying float() and catching ValueError on every line
+    n = 0
+    with file_path.open('rb') as file:
+        for line in file:
+            if _DATA_ROW.fullmatch(line):
+                return n
+            n += 1
+    return n
+
+def _load_asd_txt(file_path: Union[str, Path]) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Parses the two-column spectrum out of an ASD .txt file.
+
+    Parameters:
+        file_path (str or Path): Path to the .asd.txt file.
+
+    Returns:
+        tuple[np.ndarray, np.ndarray]: Freshly allocated float32 wavelength and value arrays.
+    """
     file_path = Path(file_path)
-    
-    with fits.open(file_path) as hdul:
-        reflectance = hdul['Spectra'].data['I_F_Atm']
-        wavelength = hdul['Wavelength'].data['Wavelength (um)']
-    
-    return pd.DataFrame({'x': wavelength, 'y': reflectance})
+    start = _find_data_start(file_path)
 
-def extract_spectrum_from_txt(
+    if pl is not None:
+        # Fast path: skip the preamble and hand the numeric block to polars's
+        # multi-threaded reader with a fixed float32 schema
+        try:
+            df = pl.read_csv(
+                file_path,
+                separator='\t',
+                has_header=False,
+                skip_rows=start,
+                schema={"x": pl.Float32, "y": pl.Float32},
+                quote_char=None,
+            ).drop_nulls()  # Blank lines (e.g. at the end of the file) read as null rows
+            # Drop literal NaN values too, as the pandas parses below do
+            df = df.filter(pl.all_horizontal(pl.all().is_not_nan()))
+            return df["x"].to_numpy(writable=True), df["y"].to_numpy(writable=True)
+        except pl.exceptions.PolarsError:
+            pass  # Irregular rows; fall back to the pandas parses below
+
+    # Fixed-format path: a typed read of just the numeric block, with no dtype
+    # inference or coercion pass. usecols stops a trailing tab from turning the
+    # first column into an implicit index.
+    try:
+        df = pd.read_csv(
+            file_path,
+            sep='\t',
+            header=None,
+            names=["x", "y"],
+            usecols=[0, 1],
+            skiprows=start,
+            dtype=np.float32,
+            engine='c',
+            memory_map=True,
+            quoting=csv.QUOTE_NONE,
+        )
+    except ValueError:
+        df = None  # Irregular rows; fall back to the tolerant parse below
+
+    # Missing fields come back as NaN rather than raising; leave those files
+    # to the tolerant parse as well
+    if df is not None and not df.isna().to_numpy().any():
+        return df["x"].to_numpy(copy=True), df["y"].to_numpy(copy=True)
+
+    # Tolerant fallback for files the typed reads reject: tokenize everything
+    # as strings and coerce, so stray non-numeric lines are dropped, mirroring
+    # the old ValueError skip. low_memory=False reads in one chunk so mixed
+    # columns don't raise a DtypeWarning.
+    df = pd.read_csv(
+        file_path,
+        sep=r'\s+',
+        header=None,
+        names=["x", "y"],
+        usecols=[0, 1],
+        engine='c',
+        memory_map=True,
+        quoting=csv.QUOTE_NONE,
+        on_bad_lines='skip',
+        low_memory=False,
+    )
+    df = df.apply(pd.to_numeric, errors='coerce').dropna(ignore_index=True)
+
+    # Downcasting makes fresh float32 buffers the caller owns, so offsets can
+    # be applied to them in place
+    x = df["x"].to_numpy(dtype=np.float32, copy=True)
+    y = df["y"].to_numpy(dtype=np.float32, copy=True)
+    return x, y
+
+def _extract_arrays_from_txt(
     file_path: Union[str, Path],
     correct_offsets: bool = False,
+    join_indices: Optional[tuple] = None,
     **offset_params
-) -> pd.DataFrame:
+) -> tuple[np.ndarray, np.ndarray]:
     """
-    Extracts spectral data from an ASD .txt file, with optional offset correction.
+    Extracts spectral arrays from an ASD .txt file, with optional offset correction.
 
     Parameters:
         file_path (str or Path): Path to the .asd.txt file.
         correct_offsets (bool): Whether to apply join correction for spectrometer offsets.
+        join_indices (tuple, optional): Join indices found on another spectrum; reused if they fit this one.
         **offset_params: Additional join-related kwargs passed to the correction function (e.g., join1, join2).
 
     Returns:
-        pd.DataFrame: DataFrame with columns ['x', 'y'].
+        tuple[np.ndarray, np.ndarray]: Wavelength and value arrays.
     """
-    file_path = Path(file_path)
-    spectral_data = []
-
-    with file_path.open('r') as file:
-        for line in file:
-            if "\t" in line:
-                try:
-                    parts = line.strip().split()
-                    if len(parts) == 2:
-                        x_val = float(parts[0])
-                        y_val = float(parts[1])
-                        spectral_data.append((x_val, y_val))
-                except ValueError:
-                    continue
-
-    df = pd.DataFrame(spectral_data, columns=["x", "y"])
+    x, y = _load_asd_txt(file_path)
 
     if correct_offsets:
         # Apply offset correction if requested
-        join1 = offset_params.get("join1", (1000, 1001))
-        join2 = offset_params.get("join2", (1800, 1801))
-
-        # Compute first join offset
-        y1 = df.loc[df["x"] == join1[0], "y"].values[0]
-        y2 = df.loc[df["x"] == join1[1], "y"].values[0]
-        d1 = y2 - y1
+        joins = _join_wavelengths(offset_params, x.dtype)
+        if (
+            join_indices is None
+            or max(join_indices) >= len(x)
+            or not np.array_equal(x[list(join_indices)], joins)
+        ):
+            # Different wavelength grid; search for the joins in this spectrum
+            join_indices = _join_indices(x, *joins)
+        _apply_offsets(y, *join_indices)
 
-        seg1 = df[df["x"] <= join1[0]]
-        seg2 = df[(df["x"] >= join1[1]) & (df["x"] <= join2[0])].copy()
-        seg2["y"] = seg2["y"] - d1
-        transformed_array = pd.concat([seg1, seg2])
+    return x, y
 
-        # Compute second join offset
-        y3 = transformed_array.loc[transformed_array["x"] == join2[0], "y"].values[0]
-        y4 = df.loc[df["x"] == join2[1], "y"].values[0]
-        d2 = y4 - y3
-
-        seg3 = df[df["x"] > join2[0]].copy()
-        seg3["y"] = seg3["y"] - d2
+def extract_spectrum_from_txt(
+    file_path: Union[str, Path],
+    correct_offsets: bool = False,
+    **offset_params
+) -> pd.DataFrame:
+    """
+    Extracts spectral data from an ASD .txt file, with optional offset correction.
 
-        return pd.concat([transformed_array, seg3])
+    Parameters:
+        file_path (str or Path): Path to the .asd.txt file.
+        correct_offsets (bool): Whether to apply join correction for spectrometer offsets.
+        **offset_params: Additional join-related kwargs passed to the correction function (e.g., join1, join2).
 
-    return df
+    Returns:
+        pd.DataFrame: DataFrame with columns ['x', 'y'].
+    """
+    return _to_dataframe(*_extract_arrays_from_txt(file_path, correct_offsets, **offset_params))
 
 def correct_spectral_offsets(
     file_path: Union[str, Path],
@@ -98,79 +317,150 @@ def correct_spectral_offsets(
     Returns:
         pd.DataFrame: DataFrame with columns ['x', 'y'] of the corrected spectrum.
     """
-    file_path = Path(file_path)
-    spectral_data = []
-
-    with file_path.open('r') as file:
-        for line in file:
-            if "\t" in line:
-                try:
-                    parts = line.strip().split()
-                    if len(parts) == 2:
-                        x_val = float(parts[0])
-                        y_val = float(parts[1])
-                        spectral_data.append((x_val, y_val))
-                except ValueError:
-                    continue
-
-    df = pd.DataFrame(spectral_data, columns=["x", "y"])
+    x, y = _load_asd_txt(file_path)
+    joins = _join_wavelengths({"join1": join1, "join2": join2}, x.dtype)
+    _apply_offsets(y, *_join_indices(x, *joins))
+    return _to_dataframe(x, y)
 
-    # Step 1: First join correction
-    y1 = df.loc[df["x"] == join1[0], "y"].values[0]
-    y2 = df.loc[df["x"] == join1[1], "y"].values[0]
-    d1 = y2 - y1
+_WRITE_BUFFER_SIZE = 1 << 20
 
-    seg1 = df[df["x"] <= join1[0]]
-    seg2 = df[(df["x"] >= join1[1]) & (df["x"] <= join2[0])].copy()
-    seg2["y"] = seg2["y"] - d1
+def _write_csv(x: np.ndarray, y: np.ndarray, output_csv: Path) -> None:
+    """
+    Writes spectrum arrays to an 'x,y' CSV, using pyarrow's C writer when it is installed.
 
-    transformed_array = pd.concat([seg1, seg2])
+    Both writers use an unquoted 'x,y' header and write NaN as an empty field;
+    only pyarrow drops the trailing '.0' from integral values (350 vs 350.0).
 
-    # Step 2: Second join correction
-    y3 = transformed_array.loc[transformed_array["x"] == join2[0], "y"].values[0]
-    y4 = df.loc[df["x"] == join2[1], "y"].values[0]
-    d2 = y4 - y3
+    Parameters:
+        x (np.ndarray): Wavelengths.
+        y (np.ndarray): Values at each wavelength.
+        output_csv (Path): Destination CSV file.
+    """
+    # Writes go through a 1 MiB buffer, so a whole spectrum usually reaches the
+    # file in a single write syscall
+    if pa is None:
+        with open(output_csv, 'wb', buffering=_WRITE_BUFFER_SIZE) as f:
+            _to_dataframe(x, y).to_csv(f, index=False)
+    else:
+        # Stream a record batch over the arrays straight to the file; from_pandas
+        # marks NaN as null so it is written as an empty field
+        batch = pa.record_batch(
+            [pa.array(x, from_pandas=True), pa.array(y, from_pandas=True)],
+            names=['x', 'y'],
+        )
+        with (
+            pa.OSFile(str(output_csv), 'wb') as raw,
+            pa.BufferedOutputStream(raw, buffer_size=_WRITE_BUFFER_SIZE) as sink,
+            pacsv.CSVWriter(sink, batch.schema, write_options=_CSV_WRITE_OPTIONS) as writer,
+        ):
+            writer.write_batch(batch)
 
-    seg3 = df[df["x"] > join2[0]].copy()
-    seg3["y"] = seg3["y"] - d2
+def _process_one(
+    file: Path,
+    output_folder: Path,
+    correct_txt_offsets: bool,
+    join_indices: Optional[tuple],
+    offset_params: dict
+) -> None:
+    """
+    Converts a single .fits or .asd.txt file to CSV; runs inside a worker process.
 
-    final_array = pd.concat([transformed_array, seg3])
-    return final_array
+    Parameters:
+        file (Path): Raw spectral file to convert.
+        output_folder (Path): Folder the CSV is written to.
+        correct_txt_offsets (bool): Whether to apply offset correction to .txt files.
+        join_indices (tuple, optional): Join indices precomputed for the folder's wavelength grid.
+        offset_params (dict): Additional parameters for offset correction (e.g., join1, join2).
+    """
+    output_csv = output_folder / f"{file.stem}.csv"
+    try:
+        if file.suffix == '.fits':
+            x, y = _extract_arrays_from_fits(file)
+        elif file.suffix == '.txt':
+            x, y = _extract_arrays_from_txt(
+                file, correct_offsets=correct_txt_offsets, join_indices=join_indices, **offset_params
+            )
+        _write_csv(x, y, output_csv)
+    except Exception as e:
+        print(f"Error processing {file.name}: {e}")
 
 def preprocess_spectral_folder(
     input_folder: Union[str, Path],
     overwrite: bool = False,
     correct_txt_offsets: bool = True,
+    max_workers: Optional[int] = None,
     **offset_params
 ) -> None:
     """
     Preprocesses all .fits and .asd.txt spectral files in a folder, converting them to standardized CSVs.
 
+    Files are converted in parallel worker processes. Where workers are spawned
+    rather than forked (macOS, Windows, or when polars is installed and .txt
+    files are offset corrected), scripts calling this must guard the call with
+    ``if __name__ == "__main__":``.
+
     Parameters:
         input_folder (str or Path): Folder containing raw .fits and .txt files (non-recursive).
         overwrite (bool): Whether to overwrite existing CSV output files.
         correct_txt_offsets (bool): Whether to apply offset correction to .txt files.
+        max_workers (int, optional): Number of worker processes (defaults to the CPU count).
         **offset_params: Additional parameters for offset correction (e.g., join1, join2).
     """
     input_folder = Path(input_folder)
     output_folder = input_folder.parent / f"{input_folder.name}_processed"
     output_folder.mkdir(exist_ok=True)
 
-    for file in input_folder.iterdir():
-        if file.suffix == '.fits' or file.suffix == '.txt':
-            output_csv = output_folder / f"{file.stem}.csv"
-            if output_csv.exists() and not overwrite:
-                print(f"Warning: Output file already exists, will NOT overwrite: {output_csv.name} (use overwrite=True to overwrite)")
-                continue  # Warn and skip
-            try:
-                if file.suffix == '.fits':
-                    df = extract_spectrum_from_fits(file)
-                elif file.suffix == '.txt':
-                    df = extract_spectrum_from_txt(file, correct_offsets=correct_txt_offsets, **offset_params)
-                df.to_csv(output_csv, index=False)
-            except Exception as e:
-                print(f"Error processing {file.name}: {e}")
-        else:
-            print(f'Skipping file {file.name} (unrecognized suffix: {file.suffix})')
-            continue
+    # Existing outputs come from one listing of the output folder instead of an
+    # exists() call per input file
+    done = set() if overwrite else {p.stem for p in output_folder.glob('*.csv')}
+
+    # One readdir pass, filtering on the entry names rather than building a
+    # Path and splitting its suffix for every directory entry
+    files = []
+    with os.scandir(input_folder) as entries:
+        for entry in entries:
+            if entry.name.endswith(('.fits', '.txt')):
+                file = Path(entry.path)
+                if file.stem in done:
+                    if overwrite:
+                        print(f"Warning: Another input already writes {file.stem}.csv, skipping {file.name}")
+                    else:
+                        print(f"Warning: Output file already exists, will NOT overwrite: {file.stem}.csv (use overwrite=True to overwrite)")
+                    continue  # Warn and skip
+                # Claim the stem so a later input with the same stem (e.g. a.fits
+                # and a.txt) does not race this one to write the same CSV
+                done.add(file.stem)
+                files.append(file)
+            else:
+                print(f'Skipping file {entry.name} (unrecognized suffix: {Path(entry.name).suffix})')
+
+    join_indices = None
+    polars_used = False
+    txt_files = [file for file in files if file.suffix == '.txt']
+    if correct_txt_offsets and txt_files:
+        # Spectra from one spectrometer share a wavelength grid, so locate the
+        # joins once on the first file; workers check the indices still fit
+        polars_used = pl is not None
+        try:
+            x, _ = _load_asd_txt(txt_files[0])
+            join_indices = _join_indices(x, *_join_wavelengths(offset_params, x.dtype))
+        except Exception:
+            pass  # The worker reports the error for this file
+
+        if njit is not None:
+            # Compile (or load from the on-disk cache) the float32 offset kernel
+            # once up front, so workers reuse it instead of each paying the JIT cost
+            _apply_offsets(np.zeros(4, dtype=np.float32), 0, 1, 2, 3)
 
+    # If polars parsed a file here, spawn rather than fork workers: forking
+    # after its thread pool has started can deadlock the child processes
+    mp_context = multiprocessing.get_context('spawn') if polars_used else None
+    with ProcessPoolExecutor(max_workers=max_workers, mp_context=mp_context) as executor:
+        list(executor.map(
+            _process_one,
+            files,
+            repeat(output_folder),
+            repeat(correct_txt_offsets),
+            repeat(join_indices),
+            repeat(offset_params),
+        ))